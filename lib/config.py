@@ -10,6 +10,9 @@ from lib.types import CONFIG_DICT_TYPE, FilterType
 
 logger = logging.getLogger(__name__)
 
+# Use the C implementation of the YAML loader when PyYAML was built with libyaml.
+YAML_LOADER = yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader
+
 
 class Configuration:
     """The config or a sub-config that the bot uses."""
@@ -397,7 +400,7 @@ def load_config(config_file: str) -> Configuration:
     """
     with open(config_file) as stream:
         try:
-            CONFIG = yaml.safe_load(stream)
+            CONFIG = yaml.load(stream, Loader=YAML_LOADER)  # noqa: S506 (YAML_LOADER is always a safe loader)
         except Exception:
             logger.exception("There appears to be a syntax problem with your config.yml")
             raise
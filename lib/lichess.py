@@ -1,4 +1,5 @@
 """Communication with APIs."""
+import copy
 import json
 import requests
 from urllib.parse import urljoin
@@ -302,6 +303,22 @@ class Lichess:
         """Aborts a game."""
         self.api_post("abort", game_id)
 
+    def copy_for_thread(self) -> "Lichess":
+        """
+        Create a copy that can be used in another thread.
+
+        The copy has its own HTTP sessions and rate limit timers, since a `requests.Session` isn't guaranteed to be
+        thread-safe. The rate limits that are currently in effect are copied.
+        """
+        li = copy.copy(self)
+        li.header = dict(self.header)
+        li.session = requests.Session()
+        li.session.headers.update(self.session.headers)
+        li.other_session = requests.Session()
+        li.other_session.headers.update(self.other_session.headers)
+        li.rate_limit_timers = defaultdict(Timer, self.rate_limit_timers)
+        return li
+
     def get_event_stream(self) -> requests.models.Response:
         """Get a stream of the events (e.g. challenge, gameStart)."""
         return self.api_get("stream_event", stream=True, timeout=15)
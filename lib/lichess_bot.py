@@ -8,37 +8,38 @@ import json
 import logging
 import logging.handlers
 import multiprocessing
+import multiprocessing.queues
 import signal
+import threading
 import time
 import datetime
 import backoff
 import os
 import io
-import copy
 import math
 import sys
 import yaml
 import traceback
-import itertools
 import glob
 import platform
 import importlib.metadata
 import contextlib
+import functools
 import test_bot.lichess
 from lib.config import load_config, Configuration, log_config
 from lib.conversation import Conversation, ChatLine
 from lib.timer import Timer, seconds, msec, hours, to_seconds
-from lib.types import (UserProfileType, EventType, GameType, GameEventType, CONTROL_QUEUE_TYPE, CORRESPONDENCE_QUEUE_TYPE,
-                       LOGGING_QUEUE_TYPE, PGN_QUEUE_TYPE)
+from lib.types import (UserProfileType, EventType, GameType, GameEventType, GameStateType, CONTROL_QUEUE_TYPE,
+                       CORRESPONDENCE_QUEUE_TYPE, LOGGING_QUEUE_TYPE, PGN_QUEUE_TYPE)
 from requests.exceptions import ChunkedEncodingError, ConnectionError, HTTPError, ReadTimeout
 from rich.logging import RichHandler
-from collections import defaultdict
+from collections import defaultdict, deque
 from collections.abc import Iterator, MutableSequence
 from http.client import RemoteDisconnected
-from queue import Empty
+from queue import Empty, Queue
 from multiprocessing.pool import Pool
 from collections import Counter
-from typing import Optional, Union, TypedDict, cast
+from typing import Callable, Optional, Union, TypedDict, cast
 from types import FrameType
 MULTIPROCESSING_LIST_TYPE = MutableSequence[model.Challenge]
 LICHESS_TYPE = Union[lichess.Lichess, test_bot.lichess.Lichess]
@@ -49,12 +50,10 @@ class PlayGameArgsType(TypedDict, total=False):
     """Type hint for `play_game_args`."""
 
     li: LICHESS_TYPE
-    control_queue: CONTROL_QUEUE_TYPE
     user_profile: UserProfileType
     config: Configuration
     challenge_queue: MULTIPROCESSING_LIST_TYPE
     correspondence_queue: CORRESPONDENCE_QUEUE_TYPE
-    logging_queue: LOGGING_QUEUE_TYPE
     pgn_queue: PGN_QUEUE_TYPE
     game_id: str
 
@@ -121,19 +120,24 @@ def upgrade_account(li: LICHESS_TYPE) -> bool:
     return True
 
 
-def watch_control_stream(control_queue: CONTROL_QUEUE_TYPE, li: LICHESS_TYPE) -> None:
-    """Put the events in a queue."""
+def watch_control_stream(control_queue: CONTROL_QUEUE_TYPE, li: LICHESS_TYPE, stop: threading.Event) -> None:
+    """
+    Put the events in a queue.
+
+    :param stop: Set when lichess-bot is quitting or restarting, so the thread should stop.
+    """
     error = None
-    while not terminated:
+    while not (terminated or stop.is_set()):
         try:
-            response = li.get_event_stream()
-            lines = response.iter_lines()
-            for line in lines:
-                if line:
-                    event = json.loads(line.decode("utf-8"))
-                    control_queue.put_nowait(event)
-                else:
-                    control_queue.put_nowait({"type": "ping"})
+            with contextlib.closing(li.get_event_stream()) as response:
+                for line in response.iter_lines():
+                    if stop.is_set():
+                        return
+                    if line:
+                        event = json.loads(line)
+                        control_queue.put_nowait(event)
+                    else:
+                        control_queue.put_nowait({"type": "ping"})
         except Exception:
             error = traceback.format_exc()
             break
@@ -141,14 +145,14 @@ def watch_control_stream(control_queue: CONTROL_QUEUE_TYPE, li: LICHESS_TYPE) ->
     control_queue.put_nowait({"type": "terminated", "error": error})
 
 
-def do_correspondence_ping(control_queue: CONTROL_QUEUE_TYPE, period: datetime.timedelta) -> None:
+def do_correspondence_ping(control_queue: CONTROL_QUEUE_TYPE, period: datetime.timedelta, stop: threading.Event) -> None:
     """
     Tell the engine to check the correspondence games.
 
     :param period: How many seconds to wait before sending a correspondence ping.
+    :param stop: Set when lichess-bot is quitting or restarting, so the thread should stop.
     """
-    while not terminated:
-        time.sleep(to_seconds(period))
+    while not (terminated or stop.wait(to_seconds(period))):
         control_queue.put_nowait({"type": "correspondence_ping"})
 
 
@@ -226,9 +230,7 @@ def logging_listener_proc(queue: LOGGING_QUEUE_TYPE, level: int, log_filename: O
     while True:
         task: Optional[logging.LogRecord] = None
         try:
-            task = queue.get(block=False)
-        except Empty:
-            time.sleep(0.1)
+            task = queue.get()
         except InterruptedError:
             pass
         except Exception:  # noqa: S110
@@ -238,16 +240,20 @@ def logging_listener_proc(queue: LOGGING_QUEUE_TYPE, level: int, log_filename: O
             continue
 
         logger.handle(task)
-        queue.task_done()
 
 
-def thread_logging_configurer(queue: LOGGING_QUEUE_TYPE) -> None:
-    """Configure the game logger."""
+def thread_logging_configurer(queue: LOGGING_QUEUE_TYPE, level: int = logging.DEBUG) -> None:
+    """
+    Configure the game logger.
+
+    :param level: The lowest level of messages sent to the logging queue. Messages below this level would be discarded by
+        `logging_listener_proc`, so they aren't created at all.
+    """
     h = logging.handlers.QueueHandler(queue)
     root = logging.getLogger()
     root.handlers.clear()
     root.addHandler(h)
-    root.setLevel(logging.DEBUG)
+    root.setLevel(level)
 
 
 def start(li: LICHESS_TYPE, user_profile: UserProfileType, config: Configuration, logging_level: int,
@@ -266,16 +272,10 @@ def start(li: LICHESS_TYPE, user_profile: UserProfileType, config: Configuration
     logger.info(f"You're now connected to {config.url} and awaiting challenges.")
     manager = multiprocessing.Manager()
     challenge_queue: MULTIPROCESSING_LIST_TYPE = manager.list()
-    control_queue: CONTROL_QUEUE_TYPE = manager.Queue()
-    control_stream = multiprocessing.Process(target=watch_control_stream, args=(control_queue, li))
-    control_stream.start()
-    correspondence_pinger = multiprocessing.Process(target=do_correspondence_ping,
-                                                    args=(control_queue,
-                                                          seconds(config.correspondence.checkin_period)))
-    correspondence_pinger.start()
+    control_queue: CONTROL_QUEUE_TYPE = Queue()
     correspondence_queue: CORRESPONDENCE_QUEUE_TYPE = manager.Queue()
 
-    logging_queue = manager.Queue()
+    logging_queue: multiprocessing.queues.Queue[logging.LogRecord] = multiprocessing.Queue()
     logging_listener = multiprocessing.Process(target=logging_listener_proc,
                                                args=(logging_queue,
                                                      logging_level,
@@ -290,27 +290,44 @@ def start(li: LICHESS_TYPE, user_profile: UserProfileType, config: Configuration
                                                  user_profile["username"]))
     pgn_listener.start()
 
-    thread_logging_configurer(logging_queue)
+    queued_logging_level = logging.DEBUG if not disable_auto_logging else logging_level
+    stop_control_threads = threading.Event()
 
     try:
-        lichess_bot_main(li,
-                         user_profile,
-                         config,
-                         challenge_queue,
-                         control_queue,
-                         correspondence_queue,
-                         logging_queue,
-                         pgn_queue,
-                         one_game)
+        # The game processes are forked before any threads are started in this process (including the feeder thread of
+        # the logging queue), so that no lock can be copied into them while another thread holds it.
+        with multiprocessing.pool.Pool(config.challenge.concurrency + 1,
+                                       initializer=thread_logging_configurer,
+                                       initargs=(logging_queue, queued_logging_level)) as pool:
+            control_stream = threading.Thread(target=watch_control_stream,
+                                              args=(control_queue, li.copy_for_thread(), stop_control_threads),
+                                              daemon=True)
+            control_stream.start()
+            correspondence_pinger = threading.Thread(target=do_correspondence_ping,
+                                                     args=(control_queue,
+                                                           seconds(config.correspondence.checkin_period),
+                                                           stop_control_threads),
+                                                     daemon=True)
+            correspondence_pinger.start()
+
+            thread_logging_configurer(logging_queue, queued_logging_level)
+
+            lichess_bot_main(li,
+                             user_profile,
+                             config,
+                             challenge_queue,
+                             control_queue,
+                             correspondence_queue,
+                             pgn_queue,
+                             pool,
+                             one_game)
     finally:
-        control_stream.terminate()
-        control_stream.join()
-        correspondence_pinger.terminate()
-        correspondence_pinger.join()
+        stop_control_threads.set()
         time.sleep(1.0)  # Allow final messages in logging_queue to be handled.
         logging_configurer(logging_level, log_filename, disable_auto_logging)
         logging_listener.terminate()
         logging_listener.join()
+        logging_queue.cancel_join_thread()
         pgn_listener.terminate()
         pgn_listener.join()
 
@@ -332,8 +349,8 @@ def lichess_bot_main(li: LICHESS_TYPE,
                      challenge_queue: MULTIPROCESSING_LIST_TYPE,
                      control_queue: CONTROL_QUEUE_TYPE,
                      correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
-                     logging_queue: LOGGING_QUEUE_TYPE,
                      pgn_queue: PGN_QUEUE_TYPE,
+                     pool: POOL_TYPE,
                      one_game: bool) -> None:
     """
     Handle all the games and challenges.
@@ -344,7 +361,7 @@ def lichess_bot_main(li: LICHESS_TYPE,
     :param challenge_queue: The queue containing the challenges.
     :param control_queue: The queue containing all the events.
     :param correspondence_queue: The queue containing the correspondence games.
-    :param logging_queue: The logging queue. Used by `logging_listener_proc`.
+    :param pool: The processes that play the games.
     :param one_game: Whether the bot should play only one game. Only used in `test_bot/test_bot.py` to test lichess-bot.
     """
     global restart
@@ -355,9 +372,9 @@ def lichess_bot_main(li: LICHESS_TYPE,
 
     all_games = li.get_ongoing_games()
     prune_takeback_records(all_games)
-    startup_correspondence_games = [game["gameId"]
+    startup_correspondence_games = {game["gameId"]
                                     for game in all_games
-                                    if game["speed"] == "correspondence"]
+                                    if game["speed"] == "correspondence"}
     active_games = {game["gameId"]
                     for game in all_games
                     if game["gameId"] not in startup_correspondence_games}
@@ -367,26 +384,21 @@ def lichess_bot_main(li: LICHESS_TYPE,
     matchmaker = matchmaking.Matchmaking(li, config, user_profile)
     matchmaker.show_earliest_challenge_time()
 
-    play_game_args = PlayGameArgsType(li=li, control_queue=control_queue, user_profile=user_profile,
+    play_game_args = PlayGameArgsType(li=li, user_profile=user_profile,
                                       config=config, challenge_queue=challenge_queue,
-                                      correspondence_queue=correspondence_queue, logging_queue=logging_queue,
-                                      pgn_queue=pgn_queue)
+                                      correspondence_queue=correspondence_queue, pgn_queue=pgn_queue)
 
-    recent_bot_challenges: defaultdict[str, list[Timer]] = defaultdict(list)
+    recent_bot_challenges: defaultdict[str, deque[Timer]] = defaultdict(deque)
 
     if config.quit_after_all_games_finish:
         logger.info("When quitting, lichess-bot will first wait for all running games to finish.")
         logger.info("Press Ctrl-C twice to quit immediately.")
 
-    with multiprocessing.pool.Pool(max_games + 1) as pool:
-        while not (terminated or (one_game and one_game_completed) or restart):
-            event = next_event(control_queue)
-            if not event:
-                continue
-
+    while not (terminated or (one_game and one_game_completed) or restart):
+        for event in next_events(control_queue):
             if event["type"] == "terminated":
                 restart = True
-                logger.debug(f"Terminating exception:\n{event['error']}")
+                logger.debug("Terminating exception:\n%s", event["error"])
                 control_queue.task_done()
                 break
             elif event["type"] == "local_game_done":
@@ -403,27 +415,32 @@ def lichess_bot_main(li: LICHESS_TYPE,
                 start_game(event,
                            pool,
                            play_game_args,
+                           control_queue,
                            config,
                            startup_correspondence_games,
                            correspondence_queue,
                            active_games,
                            low_time_games)
 
-            start_low_time_games(low_time_games, active_games, max_games, pool, play_game_args)
+            start_low_time_games(low_time_games, active_games, max_games, pool, play_game_args, control_queue)
             check_in_on_correspondence_games(pool,
                                              event,
                                              correspondence_queue,
                                              challenge_queue,
                                              play_game_args,
+                                             control_queue,
                                              active_games,
                                              max_games)
-            accept_challenges(li, challenge_queue, active_games, max_games)
-            matchmaker.challenge(active_games, challenge_queue, max_games)
-            check_online_status(li, user_profile, last_check_online_time)
-
             control_queue.task_done()
 
-        close_pool(pool, active_games, config)
+        if restart:
+            break
+
+        accept_challenges(li, challenge_queue, active_games, max_games)
+        matchmaker.challenge(active_games, challenge_queue, max_games)
+        check_online_status(li, user_profile, last_check_online_time)
+
+    close_pool(pool, active_games, config)
 
 
 def close_pool(pool: POOL_TYPE, active_games: set[str], config: Configuration) -> None:
@@ -435,13 +452,25 @@ def close_pool(pool: POOL_TYPE, active_games: set[str], config: Configuration) -
         pool.join()
 
 
-def next_event(control_queue: CONTROL_QUEUE_TYPE) -> EventType:
-    """Get the next event from the control queue."""
+def next_events(control_queue: CONTROL_QUEUE_TYPE) -> Iterator[EventType]:
+    """Wait for the next event from the control queue, then get any other events that are already waiting."""
+    event = next_event(control_queue)
+    while event:
+        yield event
+        event = next_event(control_queue, block=False)
+
+
+def next_event(control_queue: CONTROL_QUEUE_TYPE, block: bool = True) -> EventType:
+    """
+    Get the next event from the control queue.
+
+    :param block: Whether to wait for an event. If False, an empty event is returned when the queue is empty.
+    """
     try:
-        event = control_queue.get()
+        event = control_queue.get(block=block)
         if event is None:
             return {}
-    except InterruptedError:
+    except (InterruptedError, Empty):
         return {}
 
     if "type" not in event:
@@ -451,7 +480,7 @@ def next_event(control_queue: CONTROL_QUEUE_TYPE) -> EventType:
         return {}
 
     if event.get("type") != "ping":
-        logger.debug(f"Event: {event}")
+        logger.debug("Event: %s", event)
 
     return event
 
@@ -464,6 +493,7 @@ def check_in_on_correspondence_games(pool: POOL_TYPE,
                                      correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
                                      challenge_queue: MULTIPROCESSING_LIST_TYPE,
                                      play_game_args: PlayGameArgsType,
+                                     control_queue: CONTROL_QUEUE_TYPE,
                                      active_games: set[str],
                                      max_games: int) -> None:
     """Start correspondence games."""
@@ -481,16 +511,16 @@ def check_in_on_correspondence_games(pool: POOL_TYPE,
         game_id = correspondence_queue.get_nowait()
         correspondence_games_to_start -= 1
         correspondence_queue.task_done()
-        start_game_thread(active_games, game_id, play_game_args, pool)
+        start_game_thread(active_games, game_id, play_game_args, control_queue, pool)
 
 
 def start_low_time_games(low_time_games: list[GameType], active_games: set[str], max_games: int,
-                         pool: POOL_TYPE, play_game_args: PlayGameArgsType) -> None:
+                         pool: POOL_TYPE, play_game_args: PlayGameArgsType, control_queue: CONTROL_QUEUE_TYPE) -> None:
     """Start the games based on how much time we have left."""
     low_time_games.sort(key=lambda g: g.get("secondsLeft", math.inf))
     while low_time_games and len(active_games) < max_games:
         game_id = low_time_games.pop(0)["id"]
-        start_game_thread(active_games, game_id, play_game_args, pool)
+        start_game_thread(active_games, game_id, play_game_args, control_queue, pool)
 
 
 def accept_challenges(li: LICHESS_TYPE, challenge_queue: MULTIPROCESSING_LIST_TYPE, active_games: set[str],
@@ -546,15 +576,22 @@ def game_is_active(li: LICHESS_TYPE, game_id: str) -> bool:
     return game_id in (ongoing_game["gameId"] for ongoing_game in li.get_ongoing_games())
 
 
-def start_game_thread(active_games: set[str], game_id: str, play_game_args: PlayGameArgsType, pool: POOL_TYPE) -> None:
-    """Start a game thread."""
+def start_game_thread(active_games: set[str], game_id: str, play_game_args: PlayGameArgsType,
+                      control_queue: CONTROL_QUEUE_TYPE, pool: POOL_TYPE) -> None:
+    """
+    Start a game thread.
+
+    :param control_queue: The control queue that gets a `local_game_done` event when the game ends.
+    """
     active_games.add(game_id)
     log_proc_count("Used", active_games)
     play_game_args["game_id"] = game_id
 
+    def game_done_handler(_: None) -> None:
+        control_queue.put_nowait({"type": "local_game_done", "game": {"id": game_id}})
+
     def game_error_handler(error: BaseException) -> None:
         logger.exception("Game ended due to error:", exc_info=error)
-        control_queue = play_game_args["control_queue"]
         pgn_queue = play_game_args["pgn_queue"]
         li = play_game_args["li"]
         control_queue.put_nowait({"type": "local_game_done", "game": {"id": game_id}})
@@ -564,14 +601,16 @@ def start_game_thread(active_games: set[str], game_id: str, play_game_args: Play
 
     pool.apply_async(play_game,
                      kwds=play_game_args,
+                     callback=game_done_handler,
                      error_callback=game_error_handler)
 
 
 def start_game(event: EventType,
                pool: POOL_TYPE,
                play_game_args: PlayGameArgsType,
+               control_queue: CONTROL_QUEUE_TYPE,
                config: Configuration,
-               startup_correspondence_games: list[str],
+               startup_correspondence_games: set[str],
                correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
                active_games: set[str],
                low_time_games: list[GameType]) -> None:
@@ -581,8 +620,9 @@ def start_game(event: EventType,
     :param event: The gameStart event.
     :param pool: The thread pool that the game is added to, so they can be run asynchronously.
     :param play_game_args: The args passed to `play_game`.
+    :param control_queue: The control queue that gets a `local_game_done` event when the game ends.
     :param config: The config the bot will use.
-    :param startup_correspondence_games: A list of correspondence games that have to be started.
+    :param startup_correspondence_games: A set of correspondence games that have to be started.
     :param correspondence_queue: The queue that correspondence games are added to, to be started.
     :param active_games: A set of all the games that aren't correspondence games.
     :param low_time_games: A list of games, in which we don't have much time remaining.
@@ -595,9 +635,9 @@ def start_game(event: EventType,
         else:
             logger.info(f"--- Will start {config.url + game_id} as soon as possible")
             low_time_games.append(event["game"])
-        startup_correspondence_games.remove(game_id)
+        startup_correspondence_games.discard(game_id)
     else:
-        start_game_thread(active_games, game_id, play_game_args, pool)
+        start_game_thread(active_games, game_id, play_game_args, control_queue, pool)
 
 
 def enough_time_to_queue(event: EventType, config: Configuration) -> bool:
@@ -610,15 +650,18 @@ def enough_time_to_queue(event: EventType, config: Configuration) -> bool:
 
 def handle_challenge(event: EventType, li: LICHESS_TYPE, challenge_queue: MULTIPROCESSING_LIST_TYPE,
                      challenge_config: Configuration, user_profile: UserProfileType,
-                     recent_bot_challenges: defaultdict[str, list[Timer]]) -> None:
+                     recent_bot_challenges: defaultdict[str, deque[Timer]]) -> None:
     """Handle incoming challenges. It either accepts, declines, or queues them to accept later."""
     chlng = model.Challenge(event["challenge"], user_profile)
     if chlng.from_self:
         return
 
-    players_with_active_games = Counter(game["opponent"]["username"] for game in li.get_ongoing_games())
+    is_supported, decline_reason = chlng.is_supported_by_config(challenge_config)
+    if is_supported:
+        players_with_active_games = Counter(game["opponent"]["username"] for game in li.get_ongoing_games())
+        is_supported, decline_reason = chlng.is_supported(challenge_config, recent_bot_challenges,
+                                                          players_with_active_games, config_checked=True)
 
-    is_supported, decline_reason = chlng.is_supported(challenge_config, recent_bot_challenges, players_with_active_games)
     if is_supported:
         challenge_queue.append(chlng)
         sort_challenges(challenge_queue, challenge_config)
@@ -633,124 +676,123 @@ def handle_challenge(event: EventType, li: LICHESS_TYPE, challenge_queue: MULTIP
                       on_backoff=lichess.backoff_handler)
 def play_game(li: LICHESS_TYPE,
               game_id: str,
-              control_queue: CONTROL_QUEUE_TYPE,
               user_profile: UserProfileType,
               config: Configuration,
               challenge_queue: MULTIPROCESSING_LIST_TYPE,
               correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
-              logging_queue: LOGGING_QUEUE_TYPE,
               pgn_queue: PGN_QUEUE_TYPE) -> None:
     """
     Play a game.
 
     :param li: Provides communication with lichess.org.
     :param game_id: The id of the game.
-    :param control_queue: The control queue that contains events (adds `local_game_done` to the queue).
     :param user_profile: Information on our bot.
     :param config: The config that the bot will use.
     :param challenge_queue: The queue containing the challenges.
     :param correspondence_queue: The queue containing the correspondence games.
-    :param logging_queue: The logging queue. Used by `logging_listener_proc`.
     """
-    thread_logging_configurer(logging_queue)
     logger = logging.getLogger(__name__)
 
-    response = li.get_game_stream(game_id)
-    lines = response.iter_lines()
-
-    # Initial response of stream will be the full game info. Store it.
-    initial_state = json.loads(next(lines).decode("utf-8"))
-    logger.debug(f"Initial state: {initial_state}")
-    abort_time = seconds(config.abort_time)
-    game = model.Game(initial_state, user_profile["username"], li.baseUrl, abort_time)
-
-    with engine_wrapper.create_engine(config, game) as engine:
-        engine.get_opponent_info(game)
-        logger.debug(f"The engine for game {game_id} has pid={engine.get_pid()}")
-        conversation = Conversation(game, engine, li, __version__, challenge_queue)
-
-        logger.info(f"+++ {game}")
-
-        is_correspondence = game.speed == "correspondence"
-        correspondence_cfg = config.correspondence
-        correspondence_move_time = seconds(correspondence_cfg.move_time)
-        correspondence_disconnect_time = seconds(correspondence_cfg.disconnect_time)
-
-        engine_cfg = config.engine
-        ponder_cfg = correspondence_cfg if is_correspondence else engine_cfg
-        can_ponder = ponder_cfg.uci_ponder or ponder_cfg.ponder
-        move_overhead = msec(config.move_overhead)
-        delay = msec(config.rate_limiting_delay)
-
-        takebacks_accepted = read_takeback_record(game)
-        max_takebacks_accepted = config.max_takebacks_accepted
-
-        keyword_map: defaultdict[str, str] = defaultdict(str, me=game.me.name, opponent=game.opponent.name)
-        hello = get_greeting("hello", config.greeting, keyword_map)
-        goodbye = get_greeting("goodbye", config.greeting, keyword_map)
-        hello_spectators = get_greeting("hello_spectators", config.greeting, keyword_map)
-        goodbye_spectators = get_greeting("goodbye_spectators", config.greeting, keyword_map)
-
-        disconnect_time = correspondence_disconnect_time if not game.state.get("moves") else seconds(0)
-        prior_game = None
-        board = chess.Board()
-        game_stream = itertools.chain([json.dumps(game.state).encode("utf-8")], lines)
-        quit_after_all_games_finish = config.quit_after_all_games_finish
-        stay_in_game = True
-        while stay_in_game and (not terminated or quit_after_all_games_finish) and not force_quit:
-            move_attempted = False
-            try:
-                upd = next_update(game_stream)
-                u_type = upd["type"] if upd else "ping"
-                if u_type == "chatLine":
-                    conversation.react(ChatLine(upd))
-                elif u_type == "gameState":
-                    game.state = upd
-                    board = setup_board(game)
-                    takeback_field = game.state.get("btakeback") if game.is_white else game.state.get("wtakeback")
-
-                    if not is_game_over(game) and is_engine_move(game, prior_game, board):
-                        disconnect_time = correspondence_disconnect_time
-                        say_hello(conversation, hello, hello_spectators, board)
-                        setup_timer = Timer()
-                        print_move_number(board)
-                        move_attempted = True
-                        engine.play_move(board,
-                                         game,
-                                         li,
-                                         setup_timer,
-                                         move_overhead,
-                                         can_ponder,
-                                         is_correspondence,
-                                         correspondence_move_time,
-                                         engine_cfg,
-                                         fake_think_time(config, board, game))
-                        time.sleep(to_seconds(delay))
-                    elif is_game_over(game):
-                        tell_user_game_result(game, board)
-                        engine.send_game_result(game, board)
-                        conversation.send_message("player", goodbye)
-                        conversation.send_message("spectator", goodbye_spectators)
-                    elif (takeback_field
-                            and not bot_to_move(game, board)
-                            and li.accept_takeback(game.id, takebacks_accepted < max_takebacks_accepted)):
-                        takebacks_accepted += 1
-                        record_takeback(game, takebacks_accepted)
-                        engine.discard_last_move_commentary()
-
-                    wbtime = upd[engine_wrapper.wbtime(board)]
-                    wbinc = upd[engine_wrapper.wbinc(board)]
-                    terminate_time = msec(wbtime) + msec(wbinc) + seconds(60)
-                    game.ping(abort_time, terminate_time, disconnect_time)
-                    prior_game = copy.deepcopy(game)
-                elif u_type == "ping" and should_exit_game(board, game, prior_game, li, is_correspondence):
-                    stay_in_game = False
-            except (HTTPError, ReadTimeout, RemoteDisconnected, ChunkedEncodingError, ConnectionError, StopIteration) as e:
-                stopped = isinstance(e, StopIteration)
-                stay_in_game = not stopped and (move_attempted or game_is_active(li, game.id))
-
-        pgn_record = try_get_pgn_game_record(li, config, game, board, engine)
-    final_queue_entries(control_queue, correspondence_queue, game, is_correspondence, pgn_record, pgn_queue)
+    with contextlib.closing(li.get_game_stream(game_id)) as response:
+        lines = response.iter_lines()
+
+        # Initial response of stream will be the full game info. Store it.
+        initial_state = json.loads(next(lines))
+        logger.debug("Initial state: %s", initial_state)
+        abort_time = seconds(config.abort_time)
+        game = model.Game(initial_state, user_profile["username"], li.baseUrl, abort_time)
+
+        with engine_wrapper.create_engine(config, game) as engine:
+            engine.get_opponent_info(game)
+            logger.debug("The engine for game %s has pid=%s", game_id, engine.get_pid())
+            conversation = Conversation(game, engine, li, __version__, challenge_queue)
+
+            logger.info(f"+++ {game}")
+
+            is_correspondence = game.speed == "correspondence"
+            correspondence_cfg = config.correspondence
+            correspondence_move_time = seconds(correspondence_cfg.move_time)
+            correspondence_disconnect_time = seconds(correspondence_cfg.disconnect_time)
+
+            engine_cfg = config.engine
+            ponder_cfg = correspondence_cfg if is_correspondence else engine_cfg
+            can_ponder = ponder_cfg.uci_ponder or ponder_cfg.ponder
+            move_overhead = msec(config.move_overhead)
+            use_fake_think_time = config.fake_think_time
+            delay_seconds = to_seconds(msec(config.rate_limiting_delay))
+
+            takebacks_accepted = read_takeback_record(game)
+            max_takebacks_accepted = config.max_takebacks_accepted
+
+            keyword_map: defaultdict[str, str] = defaultdict(str, me=game.me.name, opponent=game.opponent.name)
+            hello = get_greeting("hello", config.greeting, keyword_map)
+            goodbye = get_greeting("goodbye", config.greeting, keyword_map)
+            hello_spectators = get_greeting("hello_spectators", config.greeting, keyword_map)
+            goodbye_spectators = get_greeting("goodbye_spectators", config.greeting, keyword_map)
+
+            disconnect_time = correspondence_disconnect_time if not game.state.get("moves") else seconds(0)
+            prior_moves = None
+            board = chess.Board()
+            board_moves = None
+            game_stream = game_updates(game.state, lines)
+            quit_after_all_games_finish = config.quit_after_all_games_finish
+            stay_in_game = True
+            while stay_in_game and (not terminated or quit_after_all_games_finish) and not force_quit:
+                move_attempted = False
+                try:
+                    upd = next_update(game_stream)
+                    u_type = upd["type"] if upd else "ping"
+                    if u_type == "chatLine":
+                        conversation.react(ChatLine(upd))
+                    elif u_type == "gameState":
+                        game.state = upd
+                        board = update_board(board, board_moves, game)
+                        board_moves = game.state["moves"]
+                        takeback_field = upd.get("btakeback") if game.is_white else upd.get("wtakeback")
+                        game_over = is_game_over(game)
+
+                        if not game_over and is_engine_move(game, prior_moves, board):
+                            disconnect_time = correspondence_disconnect_time
+                            say_hello(conversation, hello, hello_spectators, board)
+                            setup_timer = Timer()
+                            print_move_number(board)
+                            move_attempted = True
+                            engine.play_move(board,
+                                             game,
+                                             li,
+                                             setup_timer,
+                                             move_overhead,
+                                             can_ponder,
+                                             is_correspondence,
+                                             correspondence_move_time,
+                                             engine_cfg,
+                                             fake_think_time(use_fake_think_time, move_overhead, board, game))
+                            time.sleep(delay_seconds)
+                        elif game_over:
+                            tell_user_game_result(game, board)
+                            engine.send_game_result(game, board)
+                            conversation.send_message("player", goodbye)
+                            conversation.send_message("spectator", goodbye_spectators)
+                        elif (takeback_field
+                                and not bot_to_move(game, board)
+                                and li.accept_takeback(game.id, takebacks_accepted < max_takebacks_accepted)):
+                            takebacks_accepted += 1
+                            record_takeback(game, takebacks_accepted)
+                            engine.discard_last_move_commentary()
+
+                        wbtime = upd[engine_wrapper.wbtime(board)]
+                        wbinc = upd[engine_wrapper.wbinc(board)]
+                        terminate_time = msec(wbtime) + msec(wbinc) + seconds(60)
+                        game.ping(abort_time, terminate_time, disconnect_time)
+                        prior_moves = board_moves
+                    elif u_type == "ping" and should_exit_game(board, game, prior_moves, li, is_correspondence):
+                        stay_in_game = False
+                except (HTTPError, ReadTimeout, RemoteDisconnected, ChunkedEncodingError, ConnectionError, StopIteration) as e:
+                    stopped = isinstance(e, StopIteration)
+                    stay_in_game = not stopped and (move_attempted or game_is_active(li, game.id))
+
+            pgn_record = try_get_pgn_game_record(li, config, game, board, engine)
+    final_queue_entries(correspondence_queue, game, is_correspondence, pgn_record, pgn_queue)
     delete_takeback_record(game)
 
 
@@ -806,12 +848,18 @@ def say_hello(conversation: Conversation, hello: str, hello_spectators: str, boa
         conversation.send_message("spectator", hello_spectators)
 
 
-def fake_think_time(config: Configuration, board: chess.Board, game: model.Game) -> datetime.timedelta:
-    """Calculate how much time we should wait for fake_think_time."""
+def fake_think_time(use_fake_think_time: bool, move_overhead: datetime.timedelta, board: chess.Board,
+                    game: model.Game) -> datetime.timedelta:
+    """
+    Calculate how much time we should wait for fake_think_time.
+
+    :param use_fake_think_time: The `fake_think_time` setting from the config.
+    :param move_overhead: The `move_overhead` setting from the config.
+    """
     sleep = seconds(0.0)
 
-    if config.fake_think_time and len(board.move_stack) > 9:
-        remaining = max(seconds(0), game.my_remaining_time() - msec(config.move_overhead))
+    if use_fake_think_time and len(board.move_stack) > 9:
+        remaining = max(seconds(0), game.my_remaining_time() - move_overhead)
         delay = remaining * 0.025
         accel = 0.99 ** (len(board.move_stack) - 10)
         sleep = delay * accel
@@ -825,37 +873,88 @@ def print_move_number(board: chess.Board) -> None:
     logger.info(f"move: {len(board.move_stack) // 2 + 1}")
 
 
-def next_update(lines: Iterator[bytes]) -> GameEventType:
+def game_updates(initial_state: GameStateType, lines: Iterator[bytes]) -> Iterator[GameEventType]:
+    """
+    Get the game updates, starting with the game state already read from the start of the game stream.
+
+    :param initial_state: The game state in the first message of the game stream.
+    :param lines: The rest of the game stream.
+    """
+    yield cast("GameEventType", initial_state)
+    for binary_chunk in lines:
+        yield cast("GameEventType", json.loads(binary_chunk)) if binary_chunk else {}
+
+
+def next_update(game_stream: Iterator[GameEventType]) -> GameEventType:
     """Get the next game state."""
-    binary_chunk = next(lines)
-    upd = cast(GameEventType, json.loads(binary_chunk.decode("utf-8"))) if binary_chunk else {}
+    upd = next(game_stream)
     if upd:
-        logger.debug(f"Game state: {upd}")
+        logger.debug("Game state: %s", upd)
     return upd
 
 
+@functools.lru_cache(maxsize=64)
+def starting_board(variant_name: str, initial_fen: Optional[str]) -> chess.Board:
+    """
+    Create the board at the start of a game.
+
+    The board is cached, so the FEN is only parsed and the variant only looked up once per starting position.
+    Copy the returned board before changing it.
+    """
+    if variant_name.lower() == "chess960":
+        return chess.Board(initial_fen, chess960=True)
+    elif variant_name == "From Position":
+        return chess.Board(initial_fen)
+    else:
+        VariantBoard = find_variant(variant_name)
+        return VariantBoard()
+
+
 def setup_board(game: model.Game) -> chess.Board:
     """Set up the board."""
-    if game.variant_name.lower() == "chess960":
-        board = chess.Board(game.initial_fen, chess960=True)
-    elif game.variant_name == "From Position":
-        board = chess.Board(game.initial_fen)
-    else:
-        VariantBoard = find_variant(game.variant_name)
-        board = VariantBoard()
+    board = starting_board(game.variant_name, game.initial_fen).copy()
+    push_moves(board, game.state["moves"])
+    return board
+
+
+def update_board(board: chess.Board, board_moves: Optional[str], game: model.Game) -> chess.Board:
+    """
+    Bring the board up to date with the moves in the game state.
 
-    for move in game.state["moves"].split():
+    If the new moves only add to the moves already on the board, only the new moves are played. Otherwise (for example,
+    after a takeback), the board is set up again from the start.
+
+    :param board_moves: The moves in the game state when the board was last updated. `None` if the board hasn't been set up.
+    """
+    moves = game.state["moves"]
+    if board_moves is None or not moves.startswith(board_moves):
+        return setup_board(game)
+
+    new_moves = moves[len(board_moves):]
+    if board_moves and new_moves[:1].strip():
+        return setup_board(game)
+
+    push_moves(board, new_moves)
+    return board
+
+
+def push_moves(board: chess.Board, moves: str) -> None:
+    """Play the space-separated UCI moves on the board."""
+    push_uci = board.push_uci
+    for move in moves.split():
         try:
-            board.push_uci(move)
+            push_uci(move)
         except ValueError:
             logger.exception(f"Ignoring illegal move {move} on board {board.fen()}")
 
-    return board
 
+def is_engine_move(game: model.Game, prior_moves: Optional[str], board: chess.Board) -> bool:
+    """
+    Check whether it is the engine's turn.
 
-def is_engine_move(game: model.Game, prior_game: Optional[model.Game], board: chess.Board) -> bool:
-    """Check whether it is the engine's turn."""
-    return game_changed(game, prior_game) and bot_to_move(game, board)
+    :param prior_moves: The moves in the previous game state. `None` if there is no previous game state.
+    """
+    return game_changed(game, prior_moves) and bot_to_move(game, board)
 
 
 def bot_to_move(game: model.Game, board: chess.Board) -> bool:
@@ -866,7 +965,7 @@ def bot_to_move(game: model.Game, board: chess.Board) -> bool:
     Messages from lichess can contain repeat board states if another game aspect has changed (draw offer, takeback offer,
     etc.). Use is_engine_move() to determine if the engine should play a move.
     """
-    return game.is_white == (board.turn == chess.WHITE)
+    return game.is_white == board.turn
 
 
 def is_game_over(game: model.Game) -> bool:
@@ -875,11 +974,11 @@ def is_game_over(game: model.Game) -> bool:
     return status != "started"
 
 
-def should_exit_game(board: chess.Board, game: model.Game, prior_game: Optional[model.Game], li: LICHESS_TYPE,
+def should_exit_game(board: chess.Board, game: model.Game, prior_moves: Optional[str], li: LICHESS_TYPE,
                      is_correspondence: bool) -> bool:
     """Whether we should exit a game."""
     if (is_correspondence
-            and not is_engine_move(game, prior_game, board)
+            and not is_engine_move(game, prior_moves, board)
             and game.should_disconnect_now()):
         return True
     elif game.should_abort_now():
@@ -895,10 +994,10 @@ def should_exit_game(board: chess.Board, game: model.Game, prior_game: Optional[
         return False
 
 
-def final_queue_entries(control_queue: CONTROL_QUEUE_TYPE, correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
+def final_queue_entries(correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
                         game: model.Game, is_correspondence: bool, pgn_record: str, pgn_queue: PGN_QUEUE_TYPE) -> None:
     """
-    Log the game that ended or we disconnected from, and sends a `local_game_done` for the game.
+    Log the game that ended or we disconnected from, and send its PGN record to be saved.
 
      If this is an unfinished correspondence game, put it in a queue to resume later.
     """
@@ -908,20 +1007,21 @@ def final_queue_entries(control_queue: CONTROL_QUEUE_TYPE, correspondence_queue:
     else:
         logger.info(f"--- {game.url()} Game over")
 
-    control_queue.put_nowait({"type": "local_game_done", "game": {"id": game.id}})
     pgn_queue.put_nowait({"game": {"id": game.id,
                                    "pgn": pgn_record,
                                    "complete": is_game_over(game)}})
 
 
-def game_changed(current_game: model.Game, prior_game: Optional[model.Game]) -> bool:
-    """Check whether the current game state is different from the previous game state."""
-    if prior_game is None:
+def game_changed(current_game: model.Game, prior_moves: Optional[str]) -> bool:
+    """
+    Check whether the current game state is different from the previous game state.
+
+    :param prior_moves: The moves in the previous game state. `None` if there is no previous game state.
+    """
+    if prior_moves is None:
         return True
 
-    current_game_moves_str = current_game.state["moves"]
-    prior_game_moves_str = prior_game.state["moves"]
-    return current_game_moves_str != prior_game_moves_str
+    return current_game.state["moves"] != prior_moves
 
 
 def tell_user_game_result(game: model.Game, board: chess.Board) -> None:
@@ -946,13 +1046,13 @@ def tell_user_game_result(game: model.Game, board: chess.Board) -> None:
     if termination in simple_endings:
         logger.info(simple_endings[termination])
     elif termination == model.Termination.DRAW:
-        draw_results = [(board.is_fifty_moves(), "Game drawn by 50-move rule."),
-                        (board.is_repetition(), "Game drawn by threefold repetition."),
-                        (board.is_insufficient_material(), "Game drawn from insufficient material."),
-                        (board.is_stalemate(), "Game drawn by stalemate."),
-                        (True, "Game drawn by agreement.")]
-        messages = [draw_message for is_result, draw_message in draw_results if is_result]
-        logger.info(messages[0])
+        draw_results: list[tuple[Callable[[], bool], str]] = [
+            (board.is_fifty_moves, "Game drawn by 50-move rule."),
+            (board.is_repetition, "Game drawn by threefold repetition."),
+            (board.is_insufficient_material, "Game drawn from insufficient material."),
+            (board.is_stalemate, "Game drawn by stalemate."),
+            (lambda: True, "Game drawn by agreement.")]
+        logger.info(next(draw_message for is_result, draw_message in draw_results if is_result()))
     elif termination == model.Termination.TIMEOUT:
         if winner:
             logger.info(f"{losing_name} forfeited on time.")
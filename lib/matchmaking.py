@@ -1,19 +1,20 @@
 """Challenge other bots."""
 import random
+import bisect
 import logging
 import datetime
 import contextlib
+from collections import deque
 import test_bot.lichess
 from lib import model
-from lib.timer import Timer, seconds, minutes, days, years
-from collections import defaultdict
+from lib.timer import Timer, seconds, minutes, hours, days, years
 from collections.abc import Sequence
 from lib import lichess
 from lib.config import Configuration
 from typing import Optional, Union
 from lib.types import UserProfileType, PerfType, EventType, FilterType
 MULTIPROCESSING_LIST_TYPE = Sequence[model.Challenge]
-DAILY_TIMERS_TYPE = list[Timer]
+DAILY_TIMERS_TYPE = deque[Timer]
 LICHESS_TYPE = Union[lichess.Lichess, test_bot.lichess.Lichess]
 
 logger = logging.getLogger(__name__)
@@ -21,25 +22,64 @@ logger = logging.getLogger(__name__)
 daily_challenges_file_name = "daily_challenge_times.txt"
 timestamp_format = "%Y-%m-%d %H:%M:%S\n"
 
+# Upper bounds (exclusive) on the estimated game duration in seconds for each standard time control category.
+game_duration_bounds = (179, 479, 1499)
+game_duration_categories = ("bullet", "blitz", "rapid", "classical")
+
+# The aspect of a challenge that the opponent objects to for each decline reason. An empty aspect means the whole challenge.
+decline_reason_aspects = {"generic": "",
+                          "later": "",
+                          "nobot": "",
+                          "toofast": "speed",
+                          "tooslow": "speed",
+                          "timecontrol": "speed",
+                          "rated": "mode",
+                          "casual": "mode",
+                          "standard": "variant",
+                          "variant": "variant"}
+
+
+def parse_daily_challenge_time(line: str) -> datetime.datetime:
+    """
+    Read the time a challenge was created.
+
+    :param line: A Unix timestamp, or a time in `timestamp_format` as written by older versions of lichess-bot.
+    """
+    try:
+        return datetime.datetime.fromtimestamp(int(line))
+    except ValueError:
+        return datetime.datetime.strptime(line, timestamp_format)
+
 
 def read_daily_challenges() -> DAILY_TIMERS_TYPE:
     """Read the challenges we have created in the past 24 hours from a text file."""
-    timers: DAILY_TIMERS_TYPE = []
+    timers: DAILY_TIMERS_TYPE = deque()
     try:
         with open(daily_challenges_file_name) as file:
             for line in file:
-                timers.append(Timer(days(1), datetime.datetime.strptime(line, timestamp_format)))
+                timers.append(Timer(days(1), parse_daily_challenge_time(line)))
     except FileNotFoundError:
         pass
 
-    return [timer for timer in timers if not timer.is_expired()]
+    return deque(timer for timer in timers if not timer.is_expired())
+
+
+def daily_challenge_timestamp(timer: Timer) -> str:
+    """Get the line that records when a challenge was created as a Unix timestamp."""
+    return f"{int(timer.starting_timestamp().timestamp())}\n"
 
 
 def write_daily_challenges(daily_challenges: DAILY_TIMERS_TYPE) -> None:
     """Write the challenges we have created in the past 24 hours to a text file."""
+    timestamps = "".join(daily_challenge_timestamp(timer) for timer in daily_challenges)
     with open(daily_challenges_file_name, "w") as file:
-        for timer in daily_challenges:
-            file.write(timer.starting_timestamp(timestamp_format))
+        file.write(timestamps)
+
+
+def append_daily_challenge(timer: Timer) -> None:
+    """Add a new challenge to the end of the text file of challenges created in the past 24 hours."""
+    with open(daily_challenges_file_name, "a") as file:
+        file.write(daily_challenge_timestamp(timer))
 
 
 class Matchmaking:
@@ -48,16 +88,21 @@ class Matchmaking:
     def __init__(self, li: LICHESS_TYPE, config: Configuration, user_profile: UserProfileType) -> None:
         """Initialize values needed for matchmaking."""
         self.li = li
-        self.variants = list(filter(lambda variant: variant != "fromPosition", config.challenge.variants))
+        self.variants = [variant for variant in config.challenge.variants if variant != "fromPosition"]
         self.matchmaking_cfg = config.matchmaking
+        self.allow_matchmaking: bool = self.matchmaking_cfg.allow_matchmaking
+        self.allow_during_games: bool = self.matchmaking_cfg.allow_during_games
         self.user_profile = user_profile
         self.last_challenge_created_delay = Timer(seconds(25))  # Challenges expire after 20 seconds.
         self.last_game_ended_delay = Timer(minutes(self.matchmaking_cfg.challenge_timeout))
         self.last_user_profile_update_time = Timer(minutes(5))
+        self.online_bots: list[UserProfileType] = []
+        self.last_online_bots_update_time = Timer(seconds(30))
         self.min_wait_time = seconds(60)  # Wait before new challenge to avoid api rate limits.
+        self.failed_challenge_count = 0  # Consecutive challenges that could not be sent to lichess.
 
         # Maximum time between challenges, even if there are active games
-        self.max_wait_time = minutes(10) if self.matchmaking_cfg.allow_during_games else years(10)
+        self.max_wait_time = minutes(10) if self.allow_during_games else years(10)
         self.challenge_id = ""
         self.daily_challenges = read_daily_challenges()
 
@@ -67,7 +112,7 @@ class Matchmaking:
         #   - variant (standard, horde, etc.)
         #   - casual/rated
         #   - empty string (if no other reason is given or self.filter_type is COARSE)
-        self.challenge_type_acceptable: defaultdict[tuple[str, str], bool] = defaultdict(lambda: True)
+        self.challenge_type_acceptable: dict[tuple[str, str], bool] = {}
         self.challenge_filter = self.matchmaking_cfg.challenge_filter
 
         for name in self.matchmaking_cfg.block_list:
@@ -75,16 +120,22 @@ class Matchmaking:
 
     def should_create_challenge(self) -> bool:
         """Whether we should create a challenge."""
-        matchmaking_enabled = self.matchmaking_cfg.allow_matchmaking
+        if not self.allow_matchmaking:
+            return False
         time_has_passed = self.last_game_ended_delay.is_expired()
-        challenge_expired = self.last_challenge_created_delay.is_expired() and self.challenge_id
+        challenge_expired = self.cancel_expired_challenge()
         min_wait_time_passed = self.last_challenge_created_delay.time_since_reset() > self.min_wait_time
-        if challenge_expired:
-            self.li.cancel(self.challenge_id)
-            logger.info(f"Challenge id {self.challenge_id} cancelled.")
-            self.discard_challenge(self.challenge_id)
-            self.show_earliest_challenge_time()
-        return bool(matchmaking_enabled and (time_has_passed or challenge_expired) and min_wait_time_passed)
+        return (time_has_passed or challenge_expired) and min_wait_time_passed
+
+    def cancel_expired_challenge(self) -> bool:
+        """Cancel our most recent challenge if the opponent has not answered it in time. Returns whether it was cancelled."""
+        if not (self.challenge_id and self.last_challenge_created_delay.is_expired()):
+            return False
+        self.li.cancel(self.challenge_id)
+        logger.info(f"Challenge id {self.challenge_id} cancelled.")
+        self.discard_challenge(self.challenge_id)
+        self.show_earliest_challenge_time()
+        return True
 
     def create_challenge(self, username: str, base_time: int, increment: int, days: int, variant: str,
                          mode: str) -> str:
@@ -105,6 +156,7 @@ class Matchmaking:
             self.update_daily_challenge_record()
             self.last_challenge_created_delay.reset()
             response = self.li.challenge(username, params)
+            self.failed_challenge_count = 0
             challenge_id = response.get("id", "")
             if not challenge_id:
                 logger.error(response)
@@ -114,9 +166,19 @@ class Matchmaking:
         except Exception as e:
             logger.warning("Could not create challenge")
             logger.debug(e, exc_info=e)
+            self.back_off_after_failed_challenge()
             self.show_earliest_challenge_time()
             return ""
 
+    def back_off_after_failed_challenge(self) -> None:
+        """Double the wait before the next challenge for each consecutive failure to reach lichess, up to an hour."""
+        self.failed_challenge_count += 1
+        self.min_wait_time = min(self.daily_challenge_wait_time() * 2 ** self.failed_challenge_count, hours(1))
+
+    def daily_challenge_wait_time(self) -> datetime.timedelta:
+        """Get the minimum wait between challenges based on how many challenges were created in the last 24 hours."""
+        return seconds(60) * ((len(self.daily_challenges) // 50) + 1)
+
     def update_daily_challenge_record(self) -> None:
         """
         Record timestamp of latest challenge and update minimum wait time.
@@ -127,10 +189,18 @@ class Matchmaking:
         100 - 149 challenges --> 3 minutes
         etc.
         """
-        self.daily_challenges = [timer for timer in self.daily_challenges if not timer.is_expired()]
-        self.daily_challenges.append(Timer(days(1)))
-        self.min_wait_time = seconds(60) * ((len(self.daily_challenges) // 50) + 1)
-        write_daily_challenges(self.daily_challenges)
+        # The timers are in the order they were created and all last one day, so only the oldest can be expired.
+        timer_expired = False
+        while self.daily_challenges and self.daily_challenges[0].is_expired():
+            self.daily_challenges.popleft()
+            timer_expired = True
+        new_challenge = Timer(days(1))
+        self.daily_challenges.append(new_challenge)
+        self.min_wait_time = self.daily_challenge_wait_time()
+        if timer_expired:
+            write_daily_challenges(self.daily_challenges)
+        else:
+            append_daily_challenge(new_challenge)
 
     def perf(self) -> dict[str, PerfType]:
         """Get the bot's rating in every variant. Bullet, blitz, rapid etc. are considered different variants."""
@@ -149,6 +219,17 @@ class Matchmaking:
             with contextlib.suppress(Exception):
                 self.user_profile = self.li.get_profile()
 
+    def get_online_bots(self) -> list[UserProfileType]:
+        """
+        Get the bots that are online.
+
+        The list is reused for a short time, since matchmaking tries again right away when no suitable bot is found.
+        """
+        if not self.online_bots or self.last_online_bots_update_time.is_expired():
+            self.last_online_bots_update_time.reset()
+            self.online_bots = self.li.get_online_bots()
+        return self.online_bots
+
     def get_weights(self, online_bots: list[UserProfileType], rating_preference: str, min_rating: int, max_rating: int,
                     game_type: str) -> list[int]:
         """Get the weight for each bot. A higher weights means the bot is more likely to get challenged."""
@@ -202,43 +283,66 @@ class Matchmaking:
             max_rating = bot_rating + rating_diff
         logger.info(f"Seeking {game_type} game with opponent rating in [{min_rating}, {max_rating}] ...")
         allow_tos_violation = match_config.opponent_allow_tos_violation
+        my_username = self.username()
 
         def is_suitable_opponent(bot: UserProfileType) -> bool:
-            perf = bot.get("perfs", {}).get(game_type, {})
-            return (bot["username"] != self.username()
+            perf = bot.get("perfs", {}).get(game_type)
+            return (perf is not None
+                    and bot["username"] != my_username
                     and not self.in_block_list(bot["username"])
                     and not bot.get("disabled")
                     and (allow_tos_violation or not bot.get("tosViolation"))  # Terms of Service violation.
                     and perf.get("games", 0) > 0
                     and min_rating <= perf.get("rating", 0) <= max_rating)
 
-        online_bots = self.li.get_online_bots()
-        online_bots = list(filter(is_suitable_opponent, online_bots))
+        aspects = (variant, game_type, mode) if self.challenge_filter == FilterType.FINE else ()
 
         def ready_for_challenge(bot: UserProfileType) -> bool:
-            aspects = [variant, game_type, mode] if self.challenge_filter == FilterType.FINE else []
             return all(self.should_accept_challenge(bot["username"], aspect) for aspect in aspects)
 
-        ready_bots = list(filter(ready_for_challenge, online_bots))
-        online_bots = ready_bots or online_bots
+        suitable_bots: list[UserProfileType] = []
+        ready_bots: list[UserProfileType] = []
+        for bot in self.get_online_bots():
+            if is_suitable_opponent(bot):
+                suitable_bots.append(bot)
+                if not aspects or ready_for_challenge(bot):
+                    ready_bots.append(bot)
+        online_bots = ready_bots or suitable_bots
         bot_username = None
         weights = self.get_weights(online_bots, rating_preference, min_rating, max_rating, game_type)
 
-        try:
-            bot = random.choices(online_bots, weights=weights)[0]
-            bot_profile = self.li.get_public_data(bot["username"])
-            if bot_profile.get("blocking"):
-                self.add_to_block_list(bot["username"])
-            else:
-                bot_username = bot["username"]
-        except Exception:
-            if online_bots:
+        if not online_bots:
+            logger.error("No suitable bots found to challenge.")
+        else:
+            try:
+                bot_username = self.choose_unblocked_bot(online_bots, weights)
+            except Exception:
                 logger.exception("Error:")
-            else:
-                logger.error("No suitable bots found to challenge.")
 
         return bot_username, base_time, increment, days, variant, mode
 
+    def choose_unblocked_bot(self, online_bots: list[UserProfileType], weights: list[int],
+                             max_attempts: int = 3) -> Optional[str]:
+        """
+        Randomly choose a bot that isn't blocking us.
+
+        A bot that is blocking us is added to the block list and another bot is chosen, up to `max_attempts` times, so that
+        one blocking bot doesn't waste the whole matchmaking attempt.
+        """
+        bots = list(online_bots)
+        weights = list(weights)
+        for _ in range(max_attempts):
+            if not bots:
+                break
+            index = random.choices(range(len(bots)), weights=weights)[0]
+            username: str = bots[index]["username"]
+            if not self.li.get_public_data(username).get("blocking"):
+                return username
+            self.add_to_block_list(username)
+            del bots[index]
+            del weights[index]
+        return None
+
     def get_random_config_value(self, config: Configuration, parameter: str, choices: list[str]) -> str:
         """Choose a random value from `choices` if the parameter value in the config is `random`."""
         value: str = config.lookup(parameter)
@@ -252,7 +356,10 @@ class Matchmaking:
         :param challenge_queue: The queue containing the challenges.
         :param max_games: The maximum allowed number of simultaneous games.
         """
-        max_games_for_matchmaking = max_games if self.matchmaking_cfg.allow_during_games else min(1, max_games)
+        if not self.allow_matchmaking:
+            return
+
+        max_games_for_matchmaking = max_games if self.allow_during_games else min(1, max_games)
         game_count = len(active_games) + len(challenge_queue)
         if (game_count >= max_games_for_matchmaking
                 or (game_count > 0 and self.last_challenge_created_delay.time_since_reset() < self.max_wait_time)
@@ -283,7 +390,7 @@ class Matchmaking:
 
     def show_earliest_challenge_time(self) -> None:
         """Show the earliest that the next challenge will be created."""
-        if self.matchmaking_cfg.allow_matchmaking:
+        if self.allow_matchmaking:
             postgame_timeout = self.last_game_ended_delay.time_until_expiration()
             time_to_next_challenge = self.min_wait_time - self.last_challenge_created_delay.time_since_reset()
             time_left = max(postgame_timeout, time_to_next_challenge)
@@ -319,7 +426,7 @@ class Matchmaking:
         :param game_aspect: A category of the challenge type (time control, chess variant, etc.) to test for acceptance.
         If game_aspect is empty, this is equivalent to checking if the opponent is in the block list.
         """
-        return self.challenge_type_acceptable[(username, game_aspect)]
+        return self.challenge_type_acceptable.get((username, game_aspect), True)
 
     def accepted_challenge(self, event: EventType) -> None:
         """
@@ -343,28 +450,34 @@ class Matchmaking:
         if not challenge.from_self or self.challenge_filter == FilterType.NONE:
             return
 
-        mode = "rated" if challenge.rated else "casual"
-        decline_details: dict[str, str] = {"generic": "",
-                                           "later": "",
-                                           "nobot": "",
-                                           "toofast": challenge.speed,
-                                           "tooslow": challenge.speed,
-                                           "timecontrol": challenge.speed,
-                                           "rated": mode,
-                                           "casual": mode,
-                                           "standard": challenge.variant,
-                                           "variant": challenge.variant}
-
         reason_key = event["challenge"]["declineReasonKey"].lower()
-        if reason_key not in decline_details:
+        if reason_key not in decline_reason_aspects:
             logger.warning(f"Unknown decline reason received: {reason_key}")
-        game_problem = decline_details.get(reason_key, "") if self.challenge_filter == FilterType.FINE else ""
+        aspect = decline_reason_aspects.get(reason_key, "") if self.challenge_filter == FilterType.FINE else ""
+        game_problem = challenge_aspect(challenge, aspect)
         self.add_challenge_filter(opponent.name, game_problem)
         logger.info(f"Will not challenge {opponent} to another {game_problem}".strip() + " game.")
 
         self.show_earliest_challenge_time()
 
 
+def challenge_aspect(challenge: model.Challenge, aspect: str) -> str:
+    """
+    Get the value of an aspect of a challenge (e.g. "blitz" for the speed).
+
+    :param challenge: The challenge.
+    :param aspect: One of "speed", "mode", or "variant". Anything else gives an empty string.
+    :return: The value of the aspect.
+    """
+    if aspect == "speed":
+        return challenge.speed
+    if aspect == "mode":
+        return challenge.mode()
+    if aspect == "variant":
+        return challenge.variant
+    return ""
+
+
 def game_category(variant: str, base_time: int, increment: int, days: int) -> str:
     """
     Get the game type (e.g. bullet, atomic, classical). Lichess has one rating for every variant regardless of time control.
@@ -375,16 +488,9 @@ def game_category(variant: str, base_time: int, increment: int, days: int) -> st
     :param days: If the game is correspondence, we have some days to play the move.
     :return: The game category.
     """
-    game_duration = base_time + increment * 40
     if variant != "standard":
         return variant
-    elif days:
+    if days:
         return "correspondence"
-    elif game_duration < 179:
-        return "bullet"
-    elif game_duration < 479:
-        return "blitz"
-    elif game_duration < 1499:
-        return "rapid"
-    else:
-        return "classical"
+    game_duration = base_time + increment * 40
+    return game_duration_categories[bisect.bisect_right(game_duration_bounds, game_duration)]
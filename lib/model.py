@@ -6,7 +6,7 @@ import datetime
 from enum import Enum
 from lib.timer import Timer, msec, seconds, sec_str, to_msec, to_seconds, years
 from lib.config import Configuration
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter
 from lib.types import UserProfileType, ChallengeType, GameEventType, PlayerType
 
 logger = logging.getLogger(__name__)
@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 class Challenge:
     """Store information about a challenge."""
 
+    __slots__ = ("base", "challenge_target", "challenger", "color", "days", "from_self", "id", "increment", "initial_fen",
+                 "perf_name", "rated", "speed", "time_control", "variant")
+
     def __init__(self, challenge_info: ChallengeType, user_profile: UserProfileType) -> None:
         """:param user_profile: Information about our bot."""
         self.id = challenge_info["id"]
@@ -25,8 +28,10 @@ class Challenge:
         self.increment = challenge_info.get("timeControl", {}).get("increment")
         self.base = challenge_info.get("timeControl", {}).get("limit")
         self.days = challenge_info.get("timeControl", {}).get("daysPerTurn")
-        self.challenger = Player(challenge_info.get("challenger") or {})
-        self.challenge_target = Player(challenge_info.get("destUser") or {})
+        challenger = challenge_info.get("challenger")
+        self.challenger = Player(challenger) if challenger else empty_player
+        challenge_target = challenge_info.get("destUser")
+        self.challenge_target = Player(challenge_target) if challenge_target else empty_player
         self.from_self = self.challenger.name == user_profile["username"]
         self.initial_fen = challenge_info.get("initialFen", "startpos")
         color = challenge_info["color"]
@@ -70,16 +75,16 @@ class Challenge:
         """Check whether the mode is supported."""
         return ("rated" if self.rated else "casual") in challenge_cfg.modes
 
-    def is_supported_recent(self, config: Configuration, recent_bot_challenges: defaultdict[str, list[Timer]]) -> bool:
+    def is_supported_recent(self, config: Configuration, recent_bot_challenges: defaultdict[str, deque[Timer]]) -> bool:
         """Check whether we have played a lot of games with this opponent recently. Only used when the opponent is a BOT."""
-        # Filter out old challenges
-        recent_bot_challenges[self.challenger.name] = [timer for timer
-                                                       in recent_bot_challenges[self.challenger.name]
-                                                       if not timer.is_expired()]
+        # Filter out old challenges. The timers all last the same time and are added in order, so the oldest are first.
+        recent_challenges = recent_bot_challenges[self.challenger.name]
+        while recent_challenges and recent_challenges[0].is_expired():
+            recent_challenges.popleft()
         max_recent_challenges = config.max_recent_bot_challenges
         return (not self.challenger.is_bot
                 or max_recent_challenges is None
-                or len(recent_bot_challenges[self.challenger.name]) < max_recent_challenges)
+                or len(recent_challenges) < max_recent_challenges)
 
     def decline_due_to(self, requirement_met: bool, decline_reason: str) -> str:
         """
@@ -91,23 +96,52 @@ class Challenge:
         """
         return "" if requirement_met else decline_reason
 
-    def is_supported(self, config: Configuration, recent_bot_challenges: defaultdict[str, list[Timer]],
-                     players_with_active_games: Counter[str]) -> tuple[bool, str]:
-        """Whether the challenge is supported."""
+    def config_decline_reason(self, config: Configuration) -> str:
+        """
+        Get the reason to decline the challenge that only depends on the challenge and the config.
+
+        :return: The decline reason, or an empty string if the challenge meets all of these requirements.
+        """
+        allowed_opponents: list[str] = list(filter(None, config.allow_list)) or [self.challenger.name]
+        return (self.decline_due_to(config.accept_bot or not self.challenger.is_bot, "noBot")
+                or self.decline_due_to(not config.only_bot or self.challenger.is_bot, "onlyBot")
+                or self.decline_due_to(self.is_supported_time_control(config), "timeControl")
+                or self.decline_due_to(self.is_supported_variant(config), "variant")
+                or self.decline_due_to(self.is_supported_mode(config), "casual" if self.rated else "rated")
+                or self.decline_due_to(self.challenger.name not in config.block_list, "generic")
+                or self.decline_due_to(self.challenger.name in allowed_opponents, "generic"))
+
+    def is_supported_by_config(self, config: Configuration) -> tuple[bool, str]:
+        """
+        Whether the challenge is supported, only checking the requirements that don't need information from lichess.
+
+        Challenges that fail these checks can be declined without asking lichess for the bot's ongoing games.
+        """
+        try:
+            if self.from_self:
+                return True, ""
+
+            decline_reason = self.config_decline_reason(config)
+            return not decline_reason, decline_reason
+
+        except Exception:
+            logger.exception(f"Error while checking challenge {self.id}:")
+            return False, "generic"
+
+    def is_supported(self, config: Configuration, recent_bot_challenges: defaultdict[str, deque[Timer]],
+                     players_with_active_games: Counter[str], config_checked: bool = False) -> tuple[bool, str]:
+        """
+        Whether the challenge is supported.
+
+        :param config_checked: Whether `is_supported_by_config` has already passed, so its requirements aren't checked again.
+        """
         try:
             if self.from_self:
                 return True, ""
 
             from extra_game_handlers import is_supported_extra
 
-            allowed_opponents: list[str] = list(filter(None, config.allow_list)) or [self.challenger.name]
-            decline_reason = (self.decline_due_to(config.accept_bot or not self.challenger.is_bot, "noBot")
-                              or self.decline_due_to(not config.only_bot or self.challenger.is_bot, "onlyBot")
-                              or self.decline_due_to(self.is_supported_time_control(config), "timeControl")
-                              or self.decline_due_to(self.is_supported_variant(config), "variant")
-                              or self.decline_due_to(self.is_supported_mode(config), "casual" if self.rated else "rated")
-                              or self.decline_due_to(self.challenger.name not in config.block_list, "generic")
-                              or self.decline_due_to(self.challenger.name in allowed_opponents, "generic")
+            decline_reason = (("" if config_checked else self.config_decline_reason(config))
                               or self.decline_due_to(self.is_supported_recent(config, recent_bot_challenges), "later")
                               or self.decline_due_to(players_with_active_games[self.challenger.name]
                                                      < config.max_simultaneous_games_per_user, "later")
@@ -153,6 +187,10 @@ class Termination(str, Enum):
 class Game:
     """Store information about a game."""
 
+    __slots__ = ("abort_time", "base_url", "black", "clock_increment", "clock_initial", "created_at", "disconnect_time",
+                 "game_url", "game_url_with_color", "id", "initial_fen", "is_white", "me", "mode", "my_color", "opponent",
+                 "opponent_color", "perf_name", "speed", "state", "terminate_time", "username", "variant_name", "white")
+
     def __init__(self, game_info: GameEventType, username: str, base_url: str, abort_time: datetime.timedelta) -> None:
         """:param abort_time: How long to wait before aborting the game."""
         self.username = username
@@ -175,19 +213,25 @@ class Game:
         self.me = self.white if self.is_white else self.black
         self.opponent = self.black if self.is_white else self.white
         self.base_url = base_url
-        self.game_start = datetime.datetime.fromtimestamp(to_seconds(msec(game_info["createdAt"])),
-                                                          tz=datetime.timezone.utc)
+        self.game_url = urljoin(base_url, self.id)
+        self.game_url_with_color = f"{self.game_url}/{self.my_color}"
+        self.created_at = game_info["createdAt"]
         self.abort_time = Timer(abort_time)
         self.terminate_time = Timer(self.clock_initial + self.clock_increment + abort_time + seconds(60))
         self.disconnect_time = Timer(seconds(0))
 
+    @property
+    def game_start(self) -> datetime.datetime:
+        """When the game was created. Only the PGN headers need it, so it is built when asked for."""
+        return datetime.datetime.fromtimestamp(to_seconds(msec(self.created_at)), tz=datetime.timezone.utc)
+
     def url(self) -> str:
         """Get the url of the game."""
-        return f"{self.short_url()}/{self.my_color}"
+        return self.game_url_with_color
 
     def short_url(self) -> str:
         """Get the short url of the game."""
-        return urljoin(self.base_url, self.id)
+        return self.game_url
 
     def pgn_event(self) -> str:
         """Get the event to write in the PGN file."""
@@ -215,9 +259,12 @@ class Game:
         :param disconnect_in: How many seconds to wait before disconnecting.
         """
         if self.is_abortable():
-            self.abort_time = Timer(abort_in)
-        self.terminate_time = Timer(terminate_in)
-        self.disconnect_time = Timer(disconnect_in)
+            self.abort_time.duration = abort_in
+            self.abort_time.reset()
+        self.terminate_time.duration = terminate_in
+        self.terminate_time.reset()
+        self.disconnect_time.duration = disconnect_in
+        self.disconnect_time.reset()
 
     def should_abort_now(self) -> bool:
         """Whether we should abort the game."""
@@ -233,9 +280,7 @@ class Game:
 
     def my_remaining_time(self) -> datetime.timedelta:
         """How many seconds we have left."""
-        wtime = msec(self.state["wtime"])
-        btime = msec(self.state["btime"])
-        return wtime if self.is_white else btime
+        return msec(self.state["wtime"] if self.is_white else self.state["btime"])
 
     def result(self) -> str:
         """Get the result of the game."""
@@ -271,6 +316,8 @@ class Game:
 class Player:
     """Store information about a player."""
 
+    __slots__ = ("aiLevel", "is_bot", "name", "provisional", "rating", "title")
+
     def __init__(self, player_info: PlayerType) -> None:
         """:param player_info: Contains information about a player."""
         self.title = player_info.get("title")
@@ -291,3 +338,7 @@ class Player:
     def __repr__(self) -> str:
         """Get a string representation of `Player`."""
         return self.__str__()
+
+
+# Shared by every challenge that is missing a player (e.g. an open challenge has no destination user). It is never modified.
+empty_player = Player({})
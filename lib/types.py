@@ -4,13 +4,14 @@ from chess.engine import PovWdl, PovScore, PlayResult, Limit, Opponent
 from chess import Move, Board
 from queue import Queue
 import logging
+import multiprocessing.queues
 from enum import Enum
 from types import TracebackType
 
 COMMANDS_TYPE = list[str]
 MOVE = Union[PlayResult, list[Move]]
 CORRESPONDENCE_QUEUE_TYPE = Queue[str]
-LOGGING_QUEUE_TYPE = Queue[logging.LogRecord]
+LOGGING_QUEUE_TYPE = Union[Queue[logging.LogRecord], "multiprocessing.queues.Queue[logging.LogRecord]"]
 REQUESTS_PAYLOAD_TYPE = dict[str, Union[str, int, bool]]
 GO_COMMANDS_TYPE = dict[str, str]
 EGTPATH_TYPE = dict[str, str]
@@ -102,6 +102,9 @@ class GameStream:
                 new_game_state["status"] = "started"
                 yield json.dumps(new_game_state).encode("utf-8")
 
+    def close(self) -> None:
+        """Isn't used in tests."""
+
 
 class EventStream:
     """Imitate lichess.org's EventStream. Used in tests."""
@@ -127,6 +130,9 @@ class EventStream:
                           "compat": {"bot": True,
                                      "board": True}}}).encode("utf-8")
 
+    def close(self) -> None:
+        """Isn't used in tests."""
+
 
 # Docs: https://lichess.org/api.
 class Lichess:
@@ -166,6 +172,10 @@ class Lichess:
     def abort(self, game_id: str) -> None:
         """Isn't used in tests."""
 
+    def copy_for_thread(self) -> "Lichess":
+        """Return the same object, since it doesn't use an HTTP session."""
+        return self
+
     def get_event_stream(self) -> EventStream:
         """Send the `EventStream`."""
         events = EventStream(self.sent_game)
@@ -0,0 +1,48 @@
+"""Test the functions in lichess_bot.py that don't need an engine or a connection to lichess."""
+import datetime
+import chess
+from lib import lichess_bot, model
+from lib.types import GameEventType
+
+
+def make_game() -> model.Game:
+    """Create a game that hasn't started."""
+    game_info: GameEventType = {"id": "zzzzzzzz", "variant": {"key": "standard", "name": "Standard", "short": "Std"},
+                                "speed": "bullet", "perf": {"name": "Bullet"}, "rated": False, "createdAt": 1700000000000,
+                                "white": {"id": "c", "name": "c", "title": None, "rating": 2000},
+                                "black": {"id": "b", "name": "b", "title": "BOT", "rating": 3000},
+                                "initialFen": "startpos", "clock": {"initial": 90000, "increment": 1000},
+                                "type": "gameFull",
+                                "state": {"type": "gameState", "moves": "", "wtime": 90000, "btime": 90000, "winc": 1000,
+                                          "binc": 1000, "status": "started"}}
+    return model.Game(game_info, "b", "https://lichess.org/", datetime.timedelta(seconds=30))
+
+
+def test_update_board() -> None:
+    """Test that updating the board gives the same position as setting it up from the start."""
+    game = make_game()
+    board = lichess_bot.update_board(chess.Board(), None, game)
+    board_moves = game.state["moves"]
+    for moves in ["e2e4", "e2e4 e7e5", "e2e4 e7e5 g1f3", "e2e4 e7e5 g1f3 b8c6"]:
+        game.state["moves"] = moves
+        new_board = lichess_bot.update_board(board, board_moves, game)
+        assert new_board is board  # The new moves were played on the same board.
+        board_moves = moves
+        assert board == lichess_bot.setup_board(game)
+        assert " ".join(move.uci() for move in board.move_stack) == moves
+
+
+def test_update_board_after_takeback() -> None:
+    """Test that the board is set up again when the new moves aren't an extension of the moves on the board."""
+    game = make_game()
+    old_moves = "e2e4 e7e5 g1f3"
+
+    # A takeback of one or two moves, and a takeback followed by a different move.
+    for moves in ["e2e4 e7e5", "e2e4", "e2e4 e7e5 f1c4"]:
+        game.state["moves"] = old_moves
+        board = lichess_bot.setup_board(game)
+        game.state["moves"] = moves
+        new_board = lichess_bot.update_board(board, old_moves, game)
+        assert new_board is not board
+        assert new_board == lichess_bot.setup_board(game)
+        assert " ".join(move.uci() for move in new_board.move_stack) == moves
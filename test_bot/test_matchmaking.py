@@ -0,0 +1,121 @@
+"""Tests for matchmaking."""
+
+import datetime
+import pathlib
+import pytest
+import yaml
+from collections import deque
+import test_bot.lichess
+from lib import config, matchmaking
+from lib.timer import Timer, days, hours, seconds, to_seconds
+from lib.types import ChallengeType, PublicDataType, REQUESTS_PAYLOAD_TYPE, UserProfileType
+
+
+class Lichess(test_bot.lichess.Lichess):
+    """A mocked lichess.org connection for matchmaking."""
+
+    def __init__(self, blocking_bots: set[str]) -> None:
+        """
+        Record which bots are blocking us.
+
+        :param blocking_bots: The usernames of the bots that are blocking us.
+        """
+        self.blocking_bots = blocking_bots
+        self.lichess_is_down = False
+
+    def challenge(self, username: str, payload: REQUESTS_PAYLOAD_TYPE) -> ChallengeType:  # noqa: ARG002
+        """Send a challenge unless lichess is down."""
+        if self.lichess_is_down:
+            raise ConnectionError("Could not reach lichess.org.")
+        return {"id": "zzzzzzzz"}
+
+    def get_public_data(self, user_name: str) -> PublicDataType:
+        """Report whether the bot is blocking us."""
+        return {"username": user_name, "blocking": user_name in self.blocking_bots}
+
+
+def make_matchmaking(li: Lichess) -> matchmaking.Matchmaking:
+    """Create a matchmaker with the default configuration."""
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    config.insert_default_values(CONFIG)
+    user_profile: UserProfileType = {"username": "b", "perfs": {}}
+    return matchmaking.Matchmaking(li, config.Configuration(CONFIG), user_profile)
+
+
+def test_daily_challenge_file(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test writing and reading the record of challenges created in the past 24 hours."""
+    file_name = tmp_path / "daily_challenge_times.txt"
+    monkeypatch.setattr(matchmaking, "daily_challenges_file_name", str(file_name))
+    assert matchmaking.read_daily_challenges() == deque()
+
+    now = datetime.datetime.now()
+    timers = deque([Timer(days(1), now - hours(2)), Timer(days(1), now - hours(1))])
+    matchmaking.write_daily_challenges(timers)
+    read_timers = matchmaking.read_daily_challenges()
+    assert len(read_timers) == 2
+    for timer, read_timer in zip(timers, read_timers):
+        assert abs(to_seconds(timer.time_since_reset() - read_timer.time_since_reset())) < 2
+
+    # Files written by older versions of lichess-bot use timestamp_format instead of Unix timestamps.
+    with open(file_name, "w") as file:
+        file.write((now - hours(25)).strftime(matchmaking.timestamp_format))
+        file.write((now - hours(3)).strftime(matchmaking.timestamp_format))
+    matchmaking.append_daily_challenge(Timer(days(1)))
+    read_timers = matchmaking.read_daily_challenges()
+    assert len(read_timers) == 2  # The challenge from 25 hours ago has expired.
+    assert abs(to_seconds(read_timers[0].time_since_reset() - hours(3))) < 2
+    assert to_seconds(read_timers[1].time_since_reset()) < 2
+
+
+def test_choose_unblocked_bot(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a bot that is blocking us is added to the block list and another bot is chosen."""
+    monkeypatch.setattr(matchmaking, "daily_challenges_file_name", str(tmp_path / "daily_challenge_times.txt"))
+    matchmaker = make_matchmaking(Lichess({"blocker"}))
+    online_bots: list[UserProfileType] = [{"username": "blocker"}, {"username": "friend"}]
+
+    # The blocking bot is so heavily weighted that it is always chosen first.
+    assert matchmaker.choose_unblocked_bot(online_bots, [1_000_000_000, 1]) == "friend"
+    assert matchmaker.in_block_list("blocker")
+    assert not matchmaker.in_block_list("friend")
+    assert len(online_bots) == 2
+
+    matchmaker = make_matchmaking(Lichess({"blocker_1", "blocker_2", "blocker_3", "friend"}))
+    online_bots = [{"username": "blocker_1"}, {"username": "blocker_2"}, {"username": "blocker_3"}, {"username": "friend"}]
+    assert matchmaker.choose_unblocked_bot(online_bots, [1, 1, 1, 1], max_attempts=3) is None
+    assert sum(matchmaker.in_block_list(bot["username"]) for bot in online_bots) == 3
+
+
+def test_back_off_after_failed_challenge(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the wait between challenges doubles after each failed challenge and resets after a successful one."""
+    monkeypatch.setattr(matchmaking, "daily_challenges_file_name", str(tmp_path / "daily_challenge_times.txt"))
+    li = Lichess(set())
+    matchmaker = make_matchmaking(li)
+    li.lichess_is_down = True
+
+    assert matchmaker.create_challenge("friend", 60, 1, 0, "standard", "casual") == ""
+    assert matchmaker.min_wait_time == seconds(120)
+    assert matchmaker.create_challenge("friend", 60, 1, 0, "standard", "casual") == ""
+    assert matchmaker.min_wait_time == seconds(240)
+    for _ in range(4):
+        matchmaker.create_challenge("friend", 60, 1, 0, "standard", "casual")
+    assert matchmaker.min_wait_time == hours(1)
+
+    li.lichess_is_down = False
+    assert matchmaker.create_challenge("friend", 60, 1, 0, "standard", "casual") == "zzzzzzzz"
+    assert matchmaker.min_wait_time == seconds(60)
+    assert matchmaker.failed_challenge_count == 0
+
+
+def test_game_category() -> None:
+    """Test that the estimated game duration is sorted into the right category at the boundaries."""
+    assert matchmaking.game_category("standard", 178, 0, 0) == "bullet"
+    assert matchmaking.game_category("standard", 179, 0, 0) == "blitz"
+    assert matchmaking.game_category("standard", 478, 0, 0) == "blitz"
+    assert matchmaking.game_category("standard", 479, 0, 0) == "rapid"
+    assert matchmaking.game_category("standard", 1498, 0, 0) == "rapid"
+    assert matchmaking.game_category("standard", 1499, 0, 0) == "classical"
+    assert matchmaking.game_category("standard", 60, 3, 0) == "blitz"  # 60 + 3 * 40 = 180 seconds
+    assert matchmaking.game_category("atomic", 60, 0, 0) == "atomic"
+    assert matchmaking.game_category("atomic", 0, 0, 3) == "atomic"
+    assert matchmaking.game_category("standard", 0, 0, 3) == "correspondence"
@@ -4,7 +4,7 @@ import datetime
 from lib import model
 import yaml
 from lib import config
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter
 from lib.timer import Timer
 from lib.types import ChallengeType, UserProfileType, GameEventType, PlayerType
 
@@ -42,8 +42,8 @@ def test_challenge() -> None:
     CONFIG["challenge"]["allow_list"] = []
     CONFIG["challenge"]["block_list"] = []
     configuration = config.Configuration(CONFIG).challenge
-    recent_challenges: defaultdict[str, list[Timer]] = defaultdict()
-    recent_challenges["c"] = []
+    recent_challenges: defaultdict[str, deque[Timer]] = defaultdict()
+    recent_challenges["c"] = deque()
 
     challenge_model = model.Challenge(challenge, user_profile)
     assert challenge_model.id == "zzzzzzzz"
@@ -52,10 +52,13 @@ def test_challenge() -> None:
     assert challenge_model.speed == "bullet"
     assert challenge_model.time_control["show"] == "1.5+1"
     assert challenge_model.color == "white"
+    assert challenge_model.is_supported_by_config(configuration) == (True, "")
     assert challenge_model.is_supported(configuration, recent_challenges, Counter()) == (True, "")
 
     CONFIG["challenge"]["min_base"] = 120
+    assert challenge_model.is_supported_by_config(configuration) == (False, "timeControl")
     assert challenge_model.is_supported(configuration, recent_challenges, Counter()) == (False, "timeControl")
+    assert challenge_model.is_supported(configuration, recent_challenges, Counter(), config_checked=True) == (True, "")
 
 
 def test_game() -> None: